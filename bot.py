@@ -1,23 +1,33 @@
-from typing import Callable, Dict, List, Tuple
-from collections import UserDict
-import re
-from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from datetime import date
 import pickle
+from bisect import bisect_left
 
 
 class Field:
     """Базовий клас для полів запису"""
 
+    __slots__ = ("value",)
+
     def __init__(self, value: str):
         self.value = value.strip()
 
     def __str__(self) -> str:
         return str(self.value)
 
+    def __setstate__(self, state) -> None:
+        """Відновлення з pickle, у т.ч. зі старих файлів, де був __dict__."""
+        if isinstance(state, tuple):
+            state = state[1]
+        for key, value in state.items():
+            setattr(self, key, value)
+
 
 class Name(Field):
     """Клас для зберігання імені контакту"""
 
+    __slots__ = ()
+
     def __init__(self, value: str):
         if len(value.strip()) == 0:
             raise ValueError("Name can not be empty!")
@@ -27,19 +37,20 @@ class Name(Field):
 class Phone(Field):
     """Клас для зберігання номера телефону з валідацією формату."""
 
+    __slots__ = ()
+
     def __init__(self, value: str):
+        value = value.strip()
         if Phone.isValid(value):
-            super().__init__(value)
+            self.value = value
         else:
             raise ValueError("Phone number must contain 10 digits")
 
     @staticmethod
-    def isValid(phone) -> bool:
-        """Валідація телефону - 10 цифр"""
-        if re.fullmatch(r"\d{10}", phone):
-            return True
-        else:
-            return False
+    def isValid(phone: str) -> bool:
+        """Валідація телефону (вже без пробілів) - 10 цифр"""
+        # isascii відсікає не-ASCII цифри, які isdigit теж вважає цифрами
+        return len(phone) == 10 and phone.isascii() and phone.isdigit()
 
     def __eq__(self, value: object) -> bool:
         """=="""
@@ -47,8 +58,9 @@ class Phone(Field):
 
     def edit(self, new_value: str) -> None:
         """edit phone"""
+        new_value = new_value.strip()
         if Phone.isValid(new_value):
-            self.value = new_value.strip()
+            self.value = new_value
         else:
             raise ValueError("Phone number must contain 10 digits")
 
@@ -56,48 +68,101 @@ class Phone(Field):
 class Birthday(Field):
     """Клас для зберігання дня народження."""
 
+    __slots__ = ("month", "day")
+
     def __init__(self, value: str):
+        value = value.strip()
+        # формат фіксований, тому розбираємо DD.MM.YYYY вручну замість strptime
+        digits = value[:2] + value[3:5] + value[6:]
+        if not (
+            len(value) == 10
+            and value[2] == value[5] == "."
+            and digits.isascii()
+            and digits.isdigit()
+        ):
+            raise ValueError("Invalid date format. Use DD.MM.YYYY")
         try:
-            # Перетворюємо рядок на об'єкт datetime
-            birthday = datetime.strptime(value.strip(), "%d.%m.%Y").date()
+            birthday = date(int(value[6:]), int(value[3:5]), int(value[:2]))
         except ValueError:
             raise ValueError("Invalid date format. Use DD.MM.YYYY")
         # перевірка на коректність дати
-        if birthday > datetime.today().date():
+        if birthday > date.today():
             raise ValueError("Birthday from the future is not allowed!")
+        self._set_date(birthday)
+
+    def _set_date(self, birthday: date) -> None:
         self.value = birthday
+        # місяць і день потрібні для пошуку найближчих днів народження
+        self.month = birthday.month
+        self.day = birthday.day
+
+    @classmethod
+    def from_date(cls, birthday: date) -> "Birthday":
+        """Створення з уже перевіреної дати, без розбору рядка."""
+        instance = cls.__new__(cls)
+        instance._set_date(birthday)
+        return instance
 
     def __str__(self) -> str:
-        return self.value.strftime("%d.%m.%Y")
+        # strftime на Linux не доповнює рік нулями (01.01.999)
+        return f"{self.value.day:02}.{self.value.month:02}.{self.value.year:04}"
+
+    def ordinal_in_year(self, year: int) -> int:
+        """Порядковий номер дня народження в заданому році."""
+        try:
+            return date(year, self.month, self.day).toordinal()
+        except ValueError:
+            # 29 лютого в невисокосний рік святкуємо 1 березня
+            return date(year, 3, 1).toordinal()
+
+    def __setstate__(self, state) -> None:
+        """Підтримка файлів, збережених без місяця і дня."""
+        super().__setstate__(state)
+        self._set_date(self.value)
 
 
 class Record:
     """Клас для зберігання інформації про контакт."""
 
+    __slots__ = ("name", "phones", "birthday")
+
     def __init__(self, name: str):
         self.name = Name(name)
-        self.phones = []
+        # телефони індексуються за номером для пошуку за O(1)
+        self.phones: Dict[str, Phone] = {}
         self.birthday = None
 
     def add_phone(self, phone: str) -> None:
         """Додавання номера телефону."""
-        self.phones.append(Phone(phone))
+        new_phone = Phone(phone)
+        if new_phone.value in self.phones:
+            raise ValueError(f"Phone number {new_phone.value} already exists")
+        self.phones[new_phone.value] = new_phone
 
-    def find_phone(self, phone: str) -> str:
+    def find_phone(self, phone: str) -> Phone:
         """Пошук телефону у записі."""
-        find_phone = Phone(phone)
-        for p in self.phones:
-            if p == find_phone:
-                return p
-        raise ValueError(f"Phone number {phone} not found")
+        phone = phone.strip()
+        if not Phone.isValid(phone):
+            raise ValueError("Phone number must contain 10 digits")
+        found = self.phones.get(phone)
+        if found is None:
+            raise ValueError(f"Phone number {phone} not found")
+        return found
 
     def remove_phone(self, phone: str) -> None:
         """Видалення номера телефону."""
-        self.phones.remove(self.find_phone(phone))
+        del self.phones[self.find_phone(phone).value]
 
     def edit_phone(self, old_phone: str, new_phone: str) -> None:
         """Редагування телефону."""
-        self.find_phone(old_phone).edit(new_phone)
+        phone = self.find_phone(old_phone)
+        old_value = phone.value
+        new_phone = new_phone.strip()
+        if new_phone != old_value and new_phone in self.phones:
+            raise ValueError(f"Phone number {new_phone} already exists")
+        phone.edit(new_phone)
+        # змінений номер переходить у кінець списку телефонів
+        self.phones[phone.value] = self.phones.pop(old_value)
 
     def add_birthday(self, birthday: str) -> None:
         """Додавання дня народження."""
@@ -105,50 +170,111 @@ class Record:
 
     def __str__(self) -> str:
         birthday_str = f", birthday: {self.birthday}" if self.birthday else ""
-        return f"Contact name: {self.name.value}, phones: {'; '.join(str(p) for p in self.phones)}{birthday_str}"
+        return f"Contact name: {self.name.value}, phones: {'; '.join(str(p) for p in self.phones.values())}{birthday_str}"
 
+    def __reduce__(self):
+        """Зберігаємо лише ім'я, номери і дату, а не весь граф об'єктів."""
+        birthday = self.birthday.value if self.birthday else None
+        return Record._rebuild, (self.name.value, list(self.phones), birthday)
 
-class AddressBook(UserDict):
+    @staticmethod
+    def _rebuild(name: str, phones: List[str], birthday: Optional[date]) -> "Record":
+        """Відновлення запису зі збережених даних."""
+        record = Record(name)
+        for phone in phones:
+            record.add_phone(phone)
+        if birthday:
+            # дата вже перевірена при введенні, тому не розбираємо її повторно
+            record.birthday = Birthday.from_date(birthday)
+        return record
+
+    def __setstate__(self, state: dict) -> None:
+        """Підтримка файлів, де телефони зберігались списком."""
+        if isinstance(state.get("phones"), list):
+            state["phones"] = {p.value: p for p in state["phones"]}
+        for key, value in state.items():
+            setattr(self, key, value)
+
+
+class AddressBook(dict):
     """Клас для зберігання та управління записами в адресній книзі."""
 
+    # відсортований індекс (місяць, день, ім'я); None - треба перебудувати
+    _by_mmdd: Optional[List[Tuple[int, int, str]]] = None
+
+    def _birthday_index(self) -> List[Tuple[int, int, str]]:
+        """Індекс днів народження, перебудований після змін у книзі."""
+        if self._by_mmdd is None:
+            self._by_mmdd = sorted(
+                (record.birthday.month, record.birthday.day, name)
+                for name, record in self.items()
+                if record.birthday
+            )
+        return self._by_mmdd
+
     def add_record(self, record: Record) -> None:
-        """Додавання запису до книги."""
-        self.data[record.name.value] = record
+        """Додавання (або оновлення) запису в книзі."""
+        self[record.name.value] = record
+        self._by_mmdd = None
 
     def find(self, name: str) -> Record:
         """Пошук запису за ім'ям."""
-        if name in self.data:
-            return self.data[name]
-        return None
+        return self.get(name)
 
     def delete(self, name: str) -> None:
         """Видалення запису за ім'ям."""
-        if name in self.data:
-            del self.data[name]
+        if name in self:
+            del self[name]
+            self._by_mmdd = None
         else:
             raise KeyError(f"Record with name {name} not found")
 
+    def __getstate__(self) -> None:
+        """Індекс днів народження не зберігаємо - він перебудується сам."""
+        return None
+
+    def __setstate__(self, state: dict) -> None:
+        """Підтримка файлів, збережених, коли книга була UserDict."""
+        self.update(state.get("data", {}))
+
     def get_upcoming_birthdays(self) -> list:
         """Отримання списку користувачів, яких потрібно привітати на наступному тижні."""
-        today = datetime.today().date()
+        today = date.today()
+        today_ord = today.toordinal()
+        week_ahead_ord = today_ord + 7
         upcoming_birthdays = []
 
-        for record in self.data.values():
-            if record.birthday:
-                birthday_this_year = record.birthday.value.replace(year=today.year)
-
-                if birthday_this_year < today:
-                    birthday_this_year = birthday_this_year.replace(year=today.year + 1)
-
-                if today <= birthday_this_year <= today + timedelta(days=7):
-                    upcoming_birthdays.append(
-                        {
-                            "name": str(record.name),
-                            "congratulation_date": birthday_this_year.strftime(
-                                "%d.%m.%Y"
-                            ),
-                        }
-                    )
+        # починаємо зі вчорашнього дня, щоб не пропустити 29 лютого,
+        # яке в невисокосний рік святкується 1 березня
+        yesterday = date.fromordinal(today_ord - 1)
+        cur_year = yesterday.year
+        by_mmdd = self._birthday_index()
+        total = len(by_mmdd)
+        start = bisect_left(by_mmdd, (yesterday.month, yesterday.day))
+
+        for i in range(total):
+            pos = start + i
+            if pos >= total:
+                # перехід через кінець року
+                pos -= total
+                year = cur_year + 1
+            else:
+                year = cur_year
+            name = by_mmdd[pos][2]
+            birthday_ord = self[name].birthday.ordinal_in_year(year)
+
+            if birthday_ord < today_ord:
+                continue
+            if birthday_ord > week_ahead_ord:
+                break
+            upcoming_birthdays.append(
+                {
+                    "name": name,
+                    "congratulation_date": date.fromordinal(birthday_ord).strftime(
+                        "%d.%m.%Y"
+                    ),
+                }
+            )
 
         return upcoming_birthdays
 
@@ -167,7 +293,7 @@ def input_error(func: Callable) -> Callable:
             return "Enter the correct arguments."
         except (FileNotFoundError, FileExistsError):
             return "File error!"
-        except e:
+        except Exception as e:
             return str(e)
 
     return inner
@@ -176,11 +302,12 @@ def input_error(func: Callable) -> Callable:
 @input_error
 def save_data(book, filename="addressbook.pkl"):
     with open(filename, "wb") as f:
-        pickle.dump(book, f)
+        pickle.dump(book, f, protocol=pickle.HIGHEST_PROTOCOL)
 
 
-@input_error
 def load_data(filename="addressbook.pkl"):
+    # без input_error: пошкоджений файл має зупинити бота, а не підмінити
+    # книгу текстом помилки, який потім перезапише файл при виході
     try:
         with open(filename, "rb") as f:
             return pickle.load(f)
@@ -189,12 +316,18 @@ def load_data(filename="addressbook.pkl"):
         return AddressBook()
 
 
-def parse_input(user_input: str) -> Tuple[str, List[str]]:
-    """parse input"""
-    parts = user_input.split()
-    cmd = parts[0].strip().lower() if parts else ""
-    args = parts[1:] if len(parts) > 1 else []
-    return cmd, args
+def parse_input(user_input: str) -> Tuple[str, str]:
+    """parse input: команда і нерозібраний рядок аргументів"""
+    # аргументи розбиваються лише тими командами, яким вони потрібні
+    parts = user_input.split(maxsplit=1)
+    if not parts:
+        return "", ""
+    cmd = parts[0]
+    # зазвичай команду вводять малими літерами - тоді lower() не потрібен
+    if not (cmd.isascii() and cmd.islower()):
+        cmd = cmd.lower()
+    rest = parts[1] if len(parts) > 1 else ""
+    return cmd, rest
 
 
 @input_error
@@ -241,23 +374,22 @@ def show_phone(args: List[str], contacts: AddressBook) -> str:
     name = " ".join(args).strip()
     record = contacts.find(name)
     if record:
-        phones = record.phones
+        phones = record.phones.values()
     else:
         raise KeyError(f"Record with name {name} not found")
 
     return f"{name}'s phone number is {'; '.join(str(p) for p in phones).strip()}."
 
 
-@input_error
-def show_all(contacts: AddressBook) -> str:
-    """show all contacts"""
+def show_all(contacts: AddressBook) -> Iterator[str]:
+    """show all contacts - по рядку на запис, без складання одного великого рядка"""
     if not contacts:
-        return "No contacts found."
+        yield "No contacts found."
+        return
 
-    result = "All contacts:\n"
-    for _, record in contacts.data.items():
-        result += f"{str(record)}\n"
-    return result.strip()
+    yield "All contacts:"
+    for record in contacts.values():
+        yield str(record)
 
 
 @input_error
@@ -270,11 +402,12 @@ def add_birthday(args: List[str], contacts: AddressBook) -> str:
     record = contacts.find(name)
     if record:
         record.add_birthday(birthday)
+        # повторна реєстрація оновлює індекс днів народження
+        contacts.add_record(record)
     else:
         record = Record(name)
         record.add_birthday(birthday)
         contacts.add_record(record)
-    record.add_birthday(birthday)
     return f"Added birthday {birthday} for {name}."
 
 
@@ -325,6 +458,19 @@ def show_help() -> str:
     return help_text.strip()
 
 
+# Обробники команд: (рядок аргументів, книга) -> відповідь
+HANDLERS: Dict[str, Callable[[str, AddressBook], str]] = {
+    "hello": lambda rest, contacts: "Hello! How can I assist you?",
+    "add": lambda rest, contacts: add_contact(rest.split(), contacts),
+    "change": lambda rest, contacts: change_contact(rest.split(), contacts),
+    "phone": lambda rest, contacts: show_phone(rest.split(), contacts),
+    "add-birthday": lambda rest, contacts: add_birthday(rest.split(), contacts),
+    "show-birthday": lambda rest, contacts: show_birthday(rest.split(), contacts),
+    "birthdays": lambda rest, contacts: birthdays(contacts),
+    "help": lambda rest, contacts: show_help(),
+}
+
+
 def main() -> None:
     """main"""
     # Завантаження адресної книги з файлу
@@ -333,31 +479,23 @@ def main() -> None:
 
     while True:
         user_input = input("Enter a command: ").strip()
-        command, args = parse_input(user_input)
+        command, rest = parse_input(user_input)
 
-        if command in ["close", "exit"]:
+        if command in ("close", "exit"):
             # Збереження даних перед виходом
             save_data(contacts)
             print("Good bye!")
             break
-        elif command == "hello":
-            print("Hello! How can I assist you?")
-        elif command == "add":
-            print(add_contact(args, contacts))
-        elif command == "change":
-            print(change_contact(args, contacts))
-        elif command == "phone":
-            print(show_phone(args, contacts))
-        elif command == "all":
-            print(show_all(contacts))
-        elif command == "add-birthday":
-            print(add_birthday(args, contacts))
-        elif command == "show-birthday":
-            print(show_birthday(args, contacts))
-        elif command == "birthdays":
-            print(birthdays(contacts))
-        elif command == "help":
-            print(show_help())
+
+        if command == "all":
+            # виводимо по рядку, не складаючи весь список в один рядок
+            for line in show_all(contacts):
+                print(line)
+            continue
+
+        handler = HANDLERS.get(command)
+        if handler:
+            print(handler(rest, contacts))
         else:
             print("Invalid command. Type 'help' to see available commands.")
 